@@ -57,7 +57,6 @@ import logging
 from queue import Queue
 import time
 
-from parse import parse
 import serial
 
 from grbl import (RX_BUFFER_SIZE, REALTIME_COMMANDS, DOLLAR_COMMANDS,
@@ -97,7 +96,11 @@ class Controller(Receiver):
         This means that the Controller is always reset when this type of object
         is instantiated.
     """
-    def __init__(self, port=DEF_PORT, baudrate=DEF_BAUDRATE, timeout=DEF_SERIAL_TIMEOUT, delay=DEF_SERIAL_DELAY):
+    __slots__ = ('port', 'baudrate', 'timeout', 'delay', 'flush', 'maxPacketSize',
+                 '_rxData', 'ackQ', 'bufferedBytes', 'statusQ', 'serial', 'open')
+
+    def __init__(self, port=DEF_PORT, baudrate=DEF_BAUDRATE, timeout=DEF_SERIAL_TIMEOUT, delay=DEF_SERIAL_DELAY,
+                 cpuAffinity=None, rtPriority=None):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
@@ -105,6 +108,8 @@ class Controller(Receiver):
 
         self.flush = True
         self.maxPacketSize = 128
+        # received bytes that aren't yet a complete packet
+        self._rxData = bytearray()
         self.ackQ = Queue()
         self.bufferedBytes = []
         self.statusQ = Queue()
@@ -118,26 +123,29 @@ class Controller(Receiver):
         assert self.serial and self.serial.isOpen(), f"Serial port '{port}' not open"
         self.open = True
         logging.debug(f"Opened {port} at {baudrate}")
+        # N.B. connecting resets the controller, so start the (bounded) caches
+        #  of alarm/error descriptions afresh
+        alarmDescription.cache_clear()
+        errorDescription.cache_clear()
 
-        super().__init__(name="Controller")
+        super().__init__(name="Controller", cpuAffinity=cpuAffinity, rtPriority=rtPriority)
+        self.registerFd(self.serial.fileno())
 
-    def _receive(self):
+    def _receive(self, timeout=None):
         """Read a raw (unvalidated) input packet from the device, validate it,
             and return a tuple with the input values.
 
-          ????
+          Acks (i.e., 'ok', 'error', and 'ALARM' responses) go to the ackQ and
+           status responses go to the statusQ, everything else is returned to
+           be put in the standard inputQ.
+
+          Returns: dict with the packet and its type, or None if there was no
+                    packet for the inputQ
         """
         assert self.open, f"Serial port not open: {self.port}"
-        packet = bytes([])
-        prevVal = None
-        while len(packet) < self.maxPacketSize:
-            val = self.serial.read(1)
-            packet += val
-            if val == b'\n' and prevVal == b'\r':
-                break
-            prevVal = val
-        if len(packet) >= self.maxPacketSize:
-            logging.warning("Max sized packet -- might be more data")
+        packet = self._readPacket(timeout)
+        if packet is None:
+            return None
         packet = packet.decode('utf-8')
         packet = packet.strip()
         if not packet:
@@ -178,8 +186,42 @@ class Controller(Receiver):
         else:
             packetType = PacketTypes.STANDARD
         result = {'data': str(packet), 'type': packetType}
+        if packetType == PacketTypes.STATUS:
+            self.statusQ.put_nowait(result)
+            return None
         return result
 
+    def _readPacket(self, timeout=None):
+        """Return the next CR/LF-terminated packet from the serial port.
+
+          Reads whatever is available into the receive buffer, rather than a
+           byte at a time, and holds on to anything after the end of the packet
+           for the next call.
+
+          Returns: bytearray with the packet (including its CR/LF), or None
+                    if a full packet didn't arrive within 'timeout' secs
+        """
+        while True:
+            end = self._rxData.find(b'\r\n')
+            if end >= 0:
+                packet = self._rxData[:end + 2]
+                del self._rxData[:end + 2]
+                return packet
+            if len(self._rxData) >= self.maxPacketSize:
+                logging.warning("Max sized packet -- might be more data")
+                packet = self._rxData
+                self._rxData = bytearray()
+                return packet
+            if not self._waitForInput(timeout):
+                return None
+            try:
+                n = self._readInto(self.serial.fileno(), self._rxData,
+                                   self.maxPacketSize - len(self._rxData))
+            except BlockingIOError:
+                continue
+            if not n:
+                raise IOError(f"Serial port '{self.port}' closed")
+
     def _flushInput(self):
         #### FIXME
         pass
@@ -242,37 +284,14 @@ class Controller(Receiver):
                 allInput += f"\n{inLine['data']}"
         return allInput
 
-    def receiver(self):
-        """Override base function that wraps code that reads from a comm link
-             and queues up the input.
-
-          This puts the status responses from the controller into the statusQ,
-           and all normal responses in the standard inputQ.
-
-          Loops until told to shutdown by the 'receiving' event.
-          Puts a final None value on the inputQ and indicates that its the input
-           thread is done.
-        """
-        while self.receiving.isSet():
-            inputs = self._receive()
-            if inputs and 'data' in inputs and inputs['data']:
-                isStatus = inputs['type'] == PacketTypes.STATUS
-                q = self.statusQ if isStatus else self.inputQ
-                qName = "Status" if isStatus else "Input"
-                try: 
-                    logging.debug(f"Controller Inputs: {inputs}")
-                    q.put_nowait(inputs)
-                except Exception as ex:
-                    logging.error(f"{qName} queue full, discarding input and shutting down: {ex}")
-                    self.receiving.clear()
-        self.inputQ.put(None)
-        self.closed = True
-
     def getStatus(self, block=True, timeout=None):
         """Return input from the status queue.
 
           Can optionally be a blocking call, with an optional timeout
 
+          N.B. A None is put on the status queue when the receiver thread ends,
+            so a blocking call returns None once there'll be no more status.
+
           Returns: next value from status queue, or None
         """
         statusVal = None
@@ -283,16 +302,18 @@ class Controller(Receiver):
                 statusVal = self.statusQ.get(block=True, timeout=timeout)
             except:
                 logging.debug("No status, blocking get() timed out")
-        return statusVal['data']
+        return statusVal['data'] if statusVal else None
 
     def realtimeCommand(self, cmdName):
         """Send a realtime command to the controller and return the resulting
           status information.
 
-         Realtime commands do not occupy buffer space in the controller.
+         Realtime commands do not occupy buffer space in the controller, and
+          are sent as a single raw byte (no line terminator).
         """
         assert cmdName in REALTIME_COMMANDS.keys(), f"Command '{cmdName}' not a valid realtime command"
-        self._sendCmd(chr(REALTIME_COMMANDS[cmdName]))
+        self.serial.write(REALTIME_COMMANDS[cmdName])
+        self.serial.flush()
 
     def dollarCommand(self, cmdName):
         """Send a realtime "dollar" command to the controller.
@@ -349,13 +370,17 @@ class Controller(Receiver):
         self._sendCmd(f"$J={jogCmd}F{feedrate}")
         print(f"$J={jogCmd}F{feedrate}")
 
-    def shutdown(self, blocking=True):
-        """????
+    def receiver(self):
+        """Run the base receiver loop, then tell status consumers it's done.
+
+          N.B. The wakeup pipe ends the receive loop without reading any more
+            from the controller, so the end of status has to be signalled here
+            -- otherwise a getStatus() caller would block forever.
         """
-        # poke controller to elicit both a message and status response to end wait for input
-        self._sendCmd("?")
-        self._sendCmd("$")
-        super().shutdown(blocking)
+        try:
+            super().receiver()
+        finally:
+            self.statusQ.put(None)
 
 
 #
@@ -12,6 +12,8 @@ from Receiver import Receiver
 
 #### FIXME implement this
 class Host(Receiver):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(name="Pendant")
 
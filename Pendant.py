@@ -123,6 +123,8 @@ class CoordinateSpace():
 class Pendant(Receiver):
     """Object that encapsulates the XHC WHB04B-4 pendant's USB receiver
     """
+    __slots__ = ('deviceInfo', 'device')
+
     DEF_MOTION_MODE = MotionMode.STEP
 
     VENDOR_ID = 0x10ce
@@ -213,12 +215,14 @@ class Pendant(Receiver):
         logging.debug(f"dispCmd: {[hex(x) for x in dispCmd]}")
         return dispCmd
 
-    def __init__(self, motionMode=DEF_MOTION_MODE):
+    def __init__(self, motionMode=DEF_MOTION_MODE, cpuAffinity=None, rtPriority=None):
         """Connect to the USB RF dongle and issue command to bring the pendant
             out of reset.
 
           Inputs:
             motionMode: ????
+            cpuAffinity: optional int number of the CPU to run the receiver thread on
+            rtPriority: optional int SCHED_FIFO priority for the receiver thread
         """
         self.deviceInfo = hid.enumerate(Pendant.VENDOR_ID, Pendant.PRODUCT_ID)
         if len(self.deviceInfo) > 1:
@@ -227,7 +231,7 @@ class Pendant(Receiver):
         self.device = hid.Device(path=self.deviceInfo[0]['path'])
         if self.device.manufacturer != 'KTURT.LTD':
             raise Exception(f"Invalid pendent receiver device: {self.device.manufacturer}")
-        super().__init__(name="Pendant")
+        super().__init__(name="Pendant", cpuAffinity=cpuAffinity, rtPriority=rtPriority)
         self.reset(motionMode)
 
     def _flushInput(self):
@@ -245,10 +249,14 @@ class Pendant(Receiver):
         """
         return self.device.read(8, timeout=timeout)
 
-    def _receive(self):
+    def _receive(self, timeout=None):
         """(Blocking) read a raw (unvalidated) input packet from the device,
             validate it, and return a tuple with the input values.
 
+          Blocks for at most 'timeout' secs (forever if None) -- hidapi doesn't
+           give us an fd to select on, so the read's own timeout bounds how
+           long it takes to notice a shutdown.
+
           Input packets should all be eight bytes in length, anything
            less than that is not a valid input packet.
 
@@ -257,18 +265,26 @@ class Pendant(Receiver):
 
           Returns: input packet represented as a dict with a 'data' key whose
                     whose value consists of a dict with the keys found in
-                    INPUT_FIELDS, and each value is a signed int
+                    INPUT_FIELDS, and each value is a signed int, or None if
+                    the read timed out
         """
-        while True:
-            inputPacket = self._rawInputPacket()
-            if inputPacket:
-                break
+        inputPacket = self._rawInputPacket(None if timeout is None else int(timeout * 1000))
+        if not inputPacket:
+            return None
         if len(inputPacket) != 8:
             logging.warning(f"Invalid packet: {[hex(x) for x in inputPacket] if inputPacket else 'None'}")
-        ins = dict(zip(INPUT_FIELDS, struct.unpack("BBBBBBbB", inputPacket)))
+        inputs = self._acquireSlot()
+        ins = inputs['data']
+        ins.update(zip(INPUT_FIELDS, struct.unpack("BBBBBBbB", inputPacket)))
         assert ins['hdr'] == 0x04, f"Invalid input packet header {ins['hdr']}"
         #### TODO figure out how their checksum works and validate input packets
-        return {'data': ins, 'type': "input"}
+        # N.B. every report gets queued, even ones with no key or jog (e.g., axis knob changes)
+        return inputs
+
+    def _newSlot(self):
+        """Preallocate the input dicts so _receive() can fill them in in-place.
+        """
+        return {'data': dict.fromkeys(INPUT_FIELDS, 0), 'type': "input"}
 
     def reset(self, motionMode=DEF_MOTION_MODE):
         """????
@@ -9,10 +9,9 @@ Fires up a pair of threads -- one for taking input from the pendant, updating
 '''
 
 import logging
+import re
 import threading
 
-from parse import parse
-
 from Controller import Controller
 from Host import Host
 import Pendant
@@ -25,6 +24,8 @@ MAX_NUM_MACROS = 10
 
 STATUS_POLL_INTERVAL = 0.5
 
+_MACRO_RE = re.compile(r"Macro-(\d+)\Z", re.IGNORECASE)
+
 
 assert JOG_SPEED <= MAX_SPEED
 
@@ -39,15 +40,14 @@ class ControllerInput(threading.Thread):
     """????
       <gets inputs from controller and does something with them>
     """
-    def __init__(self, runningEvent, controller):
-        self.running = runningEvent
+    def __init__(self, exitEvent, controller):
+        self.exit = exitEvent
         self.ctlr = controller
         super().__init__()
 
     def run(self):
         logging.debug("Starting controllerInput thread")
-        self.ctlr.start()
-        while self.running.isSet():
+        while not self.exit.isSet():
             print("wait for ctlr input")
             inputs = self.ctlr.getInput()
             print("CIN:", inputs)
@@ -64,8 +64,8 @@ class ControllerStatus(threading.Thread):
         'WPos': Pendant.CoordinateSpace.WORKPIECE
     }
 
-    def __init__(self, runningEvent, controller, pendant):
-        self.running = runningEvent
+    def __init__(self, exitEvent, controller, pendant):
+        self.exit = exitEvent
         self.ctlr = controller
         self.pendant = pendant
         super().__init__()
@@ -112,9 +112,12 @@ class ControllerStatus(threading.Thread):
         global axisMode  # N.B. read-only in this thread
 
         logging.debug("Starting controllerStatus thread")
-        self.ctlr.start()
-        while self.running.isSet():
-            status = self._parseStatus(self.ctlr.getStatus())
+        while not self.exit.isSet():
+            rawStatus = self.ctlr.getStatus()
+            if rawStatus is None:
+                # controller's receiver is done, there'll be no more status
+                break
+            status = self._parseStatus(rawStatus)
             logging.info(f"Status: {status}")
             self.pendant.updateDisplay(moveMode,
                                        status['coordinateSpace'],
@@ -128,23 +131,27 @@ class ControllerStatus(threading.Thread):
 class StatusPolling(threading.Thread):
     """????
     """
-    def __init__(self, stopEvent, controller):
-        self.stop = stopEvent
+    def __init__(self, exitEvent, controller):
+        self.exit = exitEvent
         self.ctlr = controller
         super().__init__()
 
     def run(self):
         logging.debug("Starting StatusPolling Thread")
-        while not self.stop.wait(STATUS_POLL_INTERVAL):
+        while not self.exit.wait(STATUS_POLL_INTERVAL):
             logging.debug("StatusPolling: Poll Status")
             self.ctlr.realtimeCommand("STATUS")
 
 
-#### TODO make use of Event objects consistent with other modules
 class Processor():
     """????
+
+      N.B. All of the threads share a single 'exit' event -- setting it tells
+        every thread to wind down, and shutdown() then joins them. It can be
+        passed in, so the application can wait on it (e.g., to find out when
+        the pendant asks for an exit).
     """
-    def __init__(self, pendant, controller, host, macros={}):
+    def __init__(self, pendant, controller, host, macros={}, exitEvent=None):
         assert isinstance(pendant, Pendant.Pendant), f"pendant is not an instance of Pendant: {type(pendant)}"
         self.pendant = pendant
         assert isinstance(controller, Controller), f"controller is not an instance of Controller: {type(controller)}"
@@ -155,18 +162,14 @@ class Processor():
         self.magicCommands = self._initMagic()
         self.macros = self._defineMacros(macros)
 
-        self.p2cRunning = threading.Event()
-        self.p2cRunning.set()
+        self.exit = threading.Event() if exitEvent is None else exitEvent
         self.p2cThread = threading.Thread(target=self.pendantInput, name="p2c")
+        self.c2piThread = ControllerInput(self.exit, self.controller)
+        self.c2psThread = ControllerStatus(self.exit, self.controller, self.pendant)
+        self.statusThread = StatusPolling(self.exit, self.controller)
 
-        self.c2pRunning = threading.Event()
-        self.c2pRunning.set()
-        self.c2piThread = ControllerInput(self.c2pRunning, self.controller)
-        self.c2psThread = ControllerStatus(self.c2pRunning, self.controller, self.pendant)
-
-        self.statusStop = threading.Event()
-        self.statusStop.clear()
-        self.statusThread = StatusPolling(self.statusStop, self.controller)
+        # N.B. start the controller exactly once, before any of its consumers run
+        self.controller.start()
 
         self.p2cThread.start()
         self.c2piThread.start()
@@ -222,9 +225,9 @@ class Processor():
         '''
         macroList = [None for _ in range(0, MAX_NUM_MACROS + 1)]
         for name, macro in macros.items():
-            res = parse("Macro-{num:d}", name)
+            res = _MACRO_RE.match(name)
             if res:
-                num = res['num']
+                num = int(res.group(1))
             else:
                 logging.warning(f"Invalid macro name '{name}': ignoring")
                 continue
@@ -245,31 +248,28 @@ class Processor():
         return list(self.magicCommands.keys())
 
     def shutdown(self):
-        if self.statusStop.isSet():
-            logging.warning("ControllerStatus thread not running")
-        else:
-            self.statusStop.set()
-            logging.debug("Waiting for ControllerStatus thread to end")
-            self.statusThread.join()
-            logging.debug("ControllerStatus thread done")
-        if self.p2cRunning.isSet():
-            self.p2cRunning.clear()
+        """Tell all threads to exit and wait for them to finish.
+
+          Safe to call more than once.
+        """
+        self.exit.set()
+        logging.debug("Waiting for StatusPolling thread to end")
+        self.statusThread.join()
+        if self.p2cThread is not threading.current_thread():
+            # N.B. the P2C thread blocks waiting for pendant input, shutting
+            #  down the pendant wakes it up
+            if not self.pendant.isShutdown():
+                self.pendant.shutdown()
             logging.debug("Waiting for P2C thread to end")
             self.p2cThread.join()
-            logging.debug("P2C thread done")
-        else:
-            logging.warning("Pendant to Controller thread not running")
-        if self.c2pRunning.isSet():
-            self.c2pRunning.clear()
-            logging.debug("Shutting down ControllerInput")
+        if not self.controller.isShutdown():
+            logging.debug("Shutting down Controller")
             self.controller.shutdown()
             assert self.controller.isShutdown(), "Controller not shut down"
-            logging.debug("Waiting for C2P threads to end")
-            self.c2piThread.join()
-            self.c2psThread.join()
-            logging.debug("C2P threads done")
-        else:
-            logging.warning("Controller to Pendant thread not running")
+        logging.debug("Waiting for C2P threads to end")
+        self.c2piThread.join()
+        self.c2psThread.join()
+        logging.debug("All Processor threads done")
 
     def isAlive(self):
         """????
@@ -284,11 +284,11 @@ class Processor():
 
         logging.debug("Starting pendantInput thread")
         self.pendant.start()
-        while self.p2cRunning.isSet():
-            inputs = self.pendant.getInput()
-            if not inputs:
+        while not self.exit.isSet():
+            packet = self.pendant.getInput()
+            if not packet:
                 continue
-            inputs = inputs['data']
+            inputs = packet['data']
             axisMode = Pendant.AxisMode.OFF if inputs['axis'] == 6 else Pendant.AxisMode.XYZ if inputs['axis'] < 20 else Pendant.AxisMode.ABC
             logging.info(f"PendantInput: {inputs}")
             key = Pendant.KEYMAP[inputs['key1']] if inputs['key2'] == 0 else Pendant.FN_KEYMAP[inputs['key2']] if inputs['key1'] == Pendant.KEYNAMES_MAP['Fn'] else None
@@ -348,12 +348,12 @@ class Processor():
                 elif key == "ApplicationExit":
                     # hard-coded as application shutdown key
                     logging.debug("PI -- ApplicationExit: SHUTDOWN")
-                    self.p2cRunning.clear()
+                    self.exit.set()
                     break
                 elif key.startswith("Macro-"):
-                    res = parse("Macro-{num:d}", key)
+                    res = _MACRO_RE.match(key)
                     if res:
-                        num = res['num']
+                        num = int(res.group(1))
                         if not self.macros[num]:
                             logging.error(f"Undefined macro: Macro-{num}")
                         else:
@@ -391,6 +391,10 @@ class Processor():
                         self.controller.jogIncrementalAxis(axis, distance, speed)
                 elif axisMode == Pendant.AxisMode.ABC:
                     logging.error("TBD")
+            self.pendant.release(packet)
+        # N.B. let everyone waiting on the exit event know, whatever the reason
+        #  for leaving the loop
+        self.exit.set()
         self.pendant.shutdown()
         logging.debug("Exit PendantInput")
 
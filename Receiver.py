@@ -3,22 +3,271 @@ Base class that provides a thread for receiving from a (USB or serial) link and
  queuing inputs up for later consumption.
 '''
 
+from collections import deque
 import logging
+import os
 import queue
+import selectors
 import threading
 import time
 
 
+# N.B. the receive path runs per frame, so only log from it when it'll be emitted
+_log = logging.getLogger(__name__)
+_dbg = _log.isEnabledFor
+
+RECEIVE_TIMEOUT = 1.0   # max time (secs) that a call to _receive() blocks
+
+INPUT_QUEUE_SIZE = 1024 # max number of input batches that can be queued up
+
+READ_SIZE = 4096        # max number of bytes taken from an fd per read
+_READ_FILL = memoryview(bytes(READ_SIZE))  # what _readInto() grows buffers with
+
+SLOT_POOL_SIZE = 16     # max number of released input slots kept for reuse
+
+BATCH_SIZE = 32         # max number of inputs queued up together
+BATCH_DELAY = 0.001     # max time (secs) an input waits for the rest of its batch
+
+YIELD_LIMIT = 100       # empty receives before the receiver starts yielding the CPU
+SUSPEND_LIMIT = 10000   # empty receives before the receiver starts sleeping
+SUSPEND_TIME = 1e-6     # time (secs) to sleep per empty receive once suspended
+
+SHUTDOWN_SPIN_TIME = 0.005  # time (secs) to yield, rather than block, waiting for shutdown
+
+# N.B. there's no sched_yield() on Windows, a zero-length sleep is the closest
+_yield = getattr(os, 'sched_yield', lambda: time.sleep(0))
+
+
+class LoadAdaptiveBackoff():
+    """Three-stage (busy -> yield -> sleep) backoff policy for a receive loop.
+
+      Consecutive empty receives first spin, then yield the CPU, and finally
+       sleep, and the first real input drops the loop back to spinning.
+      This keeps a loop whose _receive() doesn't block from burning a core
+       while idle, without adding latency when input is arriving.
+    """
+    __slots__ = ('yieldLimit', 'suspendLimit', 'suspendTime', 'idleIters')
+
+    def __init__(self, yieldLimit=YIELD_LIMIT, suspendLimit=SUSPEND_LIMIT, suspendTime=SUSPEND_TIME):
+        assert 0 <= yieldLimit <= suspendLimit, f"Invalid backoff limits: {yieldLimit}, {suspendLimit}"
+        self.yieldLimit = yieldLimit
+        self.suspendLimit = suspendLimit
+        self.suspendTime = suspendTime
+        self.idleIters = 0
+
+    def reset(self):
+        """Got some input, go back to spinning.
+        """
+        self.idleIters = 0
+
+    def onSpinWait(self):
+        """Got no input, back off according to how long it's been idle.
+        """
+        self.idleIters += 1
+        if self.idleIters <= self.yieldLimit:
+            return
+        if self.idleIters <= self.suspendLimit:
+            _yield()
+        else:
+            time.sleep(self.suspendTime)
+
+
+STOP_POLL_INTERVAL = 0.01   # time (secs) between checks when waiting on a FlagStop
+
+
+class FlagStop():
+    """Stop signal that's a plain flag.
+
+      Cheapest to check -- a single writer and reads that are atomic under the
+       GIL mean no lock is needed -- but waiting on it means polling, so wait()
+       yields for the first SHUTDOWN_SPIN_TIME secs and then sleeps between
+       checks.
+    """
+    __slots__ = ('_flag',)
+
+    def __init__(self):
+        self._flag = False
+
+    def set(self):
+        self._flag = True
+
+    def is_set(self):
+        return self._flag
+
+    def wait(self, timeout=None):
+        start = time.monotonic()
+        while not self._flag:
+            elapsed = time.monotonic() - start
+            if timeout is not None and elapsed >= timeout:
+                return False
+            if elapsed < SHUTDOWN_SPIN_TIME:
+                _yield()
+            else:
+                time.sleep(STOP_POLL_INTERVAL)
+        return True
+
+
+class EventStop(threading.Event):
+    """Stop signal that's a threading.Event.
+
+      Takes the Event's lock on every check, but can be waited on without
+       polling.
+    """
+
+
+class ConditionStop():
+    """Stop signal that's a flag guarded by a Condition.
+
+      Checks are lock-free reads of the flag (like FlagStop), and waiters block
+       on the Condition (like EventStop), at the cost of a lock when setting it.
+    """
+    __slots__ = ('_flag', '_cond')
+
+    def __init__(self):
+        self._flag = False
+        self._cond = threading.Condition()
+
+    def set(self):
+        with self._cond:
+            self._flag = True
+            self._cond.notify_all()
+
+    def is_set(self):
+        return self._flag
+
+    def wait(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(self.is_set, timeout)
+
+
+class InputQueue():
+    """Lock-free queue for handing inputs from a receiver thread to its consumer.
+
+      Has the subset of the queue.Queue interface that Receivers use, but
+       instead of taking a lock and a Condition on every put and get, it relies
+       on deque's append() and popleft() being atomic, and only touches the
+       Event when a consumer has to wait for input.
+
+      N.B. Intended for a single producer. Multiple consumers are safe, but
+        there's no fairness between them.
+    """
+    __slots__ = ('maxsize', '_items', '_ready')
+
+    def __init__(self, maxsize=INPUT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._ready = threading.Event()
+
+    def qsize(self):
+        return len(self._items)
+
+    def empty(self):
+        return not self._items
+
+    def full(self):
+        return len(self._items) >= self.maxsize
+
+    def put_nowait(self, item):
+        if len(self._items) >= self.maxsize:
+            raise queue.Full
+        self._items.append(item)
+        self._ready.set()
+
+    def put(self, item):
+        """Put an item on the queue, regardless of how full it is.
+
+          Only used for the end-of-input sentinel.
+        """
+        self._items.append(item)
+        self._ready.set()
+
+    def get(self, block=True, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                item = self._items.popleft()
+            except IndexError:
+                pass
+            else:
+                if self._items:
+                    # N.B. make sure a consumer that cleared the event wakes up
+                    self._ready.set()
+                return item
+            if not block:
+                raise queue.Empty
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            if not self._ready.wait(remaining):
+                raise queue.Empty
+            self._ready.clear()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
 class Receiver():
-    def __init__(self, name=None):
-        self.inputQ = queue.Queue()
+    """Base class for objects that receive input from a link in their own thread.
+
+      The receiver thread can optionally be pinned to a CPU (e.g., the one that
+       services the link's interrupts -- see /proc/interrupts) and/or be given
+       a SCHED_FIFO realtime priority, to keep its latency low and its working
+       set in that CPU's cache.
+
+      How the receiver thread is told to stop, how it backs off when there's no
+       input, and how long it blocks in _receive() are all pluggable.
+
+      Inputs:
+        name: name of the receiver thread
+        cpuAffinity: optional int number of the CPU to run the receiver thread on
+        rtPriority: optional int SCHED_FIFO priority (1-99) for the receiver thread
+        stop: object with set(), is_set(), and wait() methods that tells
+               the receiver thread to stop (e.g., FlagStop, EventStop, or
+               ConditionStop), defaults to a FlagStop
+        backoff: object with onSpinWait() and reset() methods that decides what
+                  to do when _receive() comes back empty (e.g.,
+                  LoadAdaptiveBackoff), defaults to a LoadAdaptiveBackoff
+        receiveTimeout: max time (secs) that a call to _receive() blocks
+
+      N.B. Attributes live in __slots__ so the receive loop's attribute lookups
+        are slot reads rather than dict lookups. Subclasses should declare
+        __slots__ for their own attributes too, otherwise they get a __dict__
+        (which works, but gives up the savings).
+    """
+    __slots__ = ('cpuAffinity', 'rtPriority', 'inputQ', '_pending', '_slotPool',
+                 'stopSignal', '_closedEvent', '_wakeupRd', '_wakeupWr', '_wakeupLock', '_selector',
+                 'backoff', 'receiveTimeout', 'receiverThread')
 
-        self.receiving = threading.Event()
-        self.receiving.clear()
-        self.closed = False
+    def __init__(self, name=None, cpuAffinity=None, rtPriority=None, *,
+                 stop=None, backoff=None, receiveTimeout=RECEIVE_TIMEOUT):
+        self.cpuAffinity = cpuAffinity
+        self.rtPriority = rtPriority
+        self.receiveTimeout = receiveTimeout
+
+        self.inputQ = InputQueue()
+        # inputs from the last batch taken off the inputQ, not yet consumed
+        self._pending = deque()
+        # input slots that consumers are done with, ready to be refilled
+        self._slotPool = deque(self._newSlot() for _ in range(SLOT_POOL_SIZE))
+
+        self.stopSignal = FlagStop() if stop is None else stop
+        self._closedEvent = threading.Event()
+
+        # self-pipe that lets shutdown() wake up a _receive() blocked on input
+        self._wakeupRd, self._wakeupWr = os.pipe()
+        os.set_blocking(self._wakeupRd, False)
+        os.set_blocking(self._wakeupWr, False)
+        # N.B. keeps shutdown() from writing to the pipe while it's being closed
+        self._wakeupLock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._wakeupRd, selectors.EVENT_READ)
+
+        self.backoff = LoadAdaptiveBackoff() if backoff is None else backoff
 
 #        threading.Thread.__init__(self, name=name)
-        self.receiverThread = threading.Thread(target=self.receiver, name=name)
+        # N.B. daemon, so a _receive() that never returns can't keep the
+        #  interpreter from exiting
+        self.receiverThread = threading.Thread(target=self.receiver, name=name, daemon=True)
 
     def __enter__(self):
         #### FIXME
@@ -29,70 +278,275 @@ class Receiver():
         self.shutdown()
 
     def start(self):
-        if self.receiving.isSet():
-            logging.debug(f"Thread '{self.receiverThread.name}' already running")
+        if self.receiverThread.is_alive():
+            _log.debug("Thread '%s' already running", self.receiverThread.name)
         else:
-            self.receiving.set()
             self.receiverThread.start()
-            logging.debug(f"Starting thread: {self.receiverThread.name}")
+            _log.debug("Starting thread: %s", self.receiverThread.name)
 
     def shutdown(self, blocking=True):
         """Tell input thread to shutdown.
 
-          Have to wait until 'closed' is set to be sure thread is shutdown.
+          Have to wait until the closed event is set to be sure thread is shutdown.
         """
-        if self.closed:
-            logging.debug("Shutdown: already closed")
-        self.receiving.clear()
+        if self._closedEvent.is_set():
+            _log.debug("Shutdown: already closed")
+        self.stopSignal.set()
+        with self._wakeupLock:
+            if self._wakeupWr is not None:
+                try:
+                    os.write(self._wakeupWr, b'x')
+                except BlockingIOError:
+                    pass    # pipe is already full of wakeups
+        if self.receiverThread.ident is None:
+            # never started, so there's no receiver thread to clean up
+            self._closeWakeup()
+            self._closedEvent.set()
         if blocking:
             self.waitForShutdown()
 
     def isShutdown(self):
-        return self.closed
+        return self._closedEvent.is_set()
+
+    def waitForShutdown(self, timeout=None):
+        """Block until the input thread is done, or until 'timeout' secs have
+            passed (forever if None).
 
-    def waitForShutdown(self):
-        while not self.closed:
-            time.sleep(1)
+          Most shutdowns finish within a few msecs of being requested, so this
+           first yields the CPU for up to SHUTDOWN_SPIN_TIME secs, checking as
+           it goes, before blocking on the closed event.
+
+          Returns: True if the input thread is done
+        """
+        start = time.monotonic()
+        spinTime = SHUTDOWN_SPIN_TIME if timeout is None else min(timeout, SHUTDOWN_SPIN_TIME)
+        while not self._closedEvent.is_set():
+            elapsed = time.monotonic() - start
+            if elapsed >= spinTime:
+                return self._closedEvent.wait(None if timeout is None else max(0.0, timeout - elapsed))
+            _yield()
+        return True
 
     def receiver(self):
         """Decorator that wraps code that reads from a comm link and queues up
             the input.
 
-          Loops until told to shutdown by the 'receiving' event.
-          Puts a final None value on the inputQ and indicates that its the input
-           thread is done.
-        """
-        while self.receiving.isSet():
-            inputs = self._receive()
-            if inputs and 'data' in inputs and inputs['data']:
-                try: 
-                    logging.debug(f"Inputs: {inputs}")
-                    self.inputQ.put_nowait(inputs)
-                except Exception as ex:
-                    logging.error(f"Input queue full, discarding input and shutting down: {ex}")
-                    self.receiving.clear()
-        self.inputQ.put(None)
-        self.closed = True
-
-    def _receive(self):
-        raise NotImplementedError("Must define a method that reads the interface and puts on the 'inputQ'")
+          Loops until told to shutdown by the stop signal, parking in
+           _receive() (rather than spinning) while there's no input, and
+           backing off if _receive() keeps coming back empty-handed.
+          Inputs that arrive back-to-back are put on the inputQ as a list of up
+           to BATCH_SIZE inputs, and a batch is held for at most BATCH_DELAY secs.
+          Puts a final None value on the inputQ, closes the wakeup pipe and
+           selector, and indicates that its the input thread is done -- even if
+           _receive() raises an exception.
+        """
+        self._setScheduling()
+
+        # N.B. hoist the loop's method and attribute lookups into locals
+        stopped = self.stopSignal.is_set
+        receiveTimeout = self.receiveTimeout
+        receive = self._receive
+        queueBatch = self._queueBatch
+        onSpinWait = self.backoff.onSpinWait
+        resetBackoff = self.backoff.reset
+        monotonic = time.monotonic
+
+        batch = []
+        batchDeadline = 0.0
+        try:
+            while not stopped():
+                timeout = max(0.0, batchDeadline - monotonic()) if batch else receiveTimeout
+                inputs = receive(timeout)
+                if inputs is None:
+                    # N.B. input has stopped coming, don't hold on to a partial batch
+                    if batch:
+                        queueBatch(batch)
+                        batch = []
+                    else:
+                        onSpinWait()
+                    continue
+                resetBackoff()
+                if _dbg(logging.DEBUG):
+                    _log.debug("Inputs: %s", inputs)
+                if not batch:
+                    batchDeadline = monotonic() + BATCH_DELAY
+                batch.append(inputs)
+                if len(batch) >= BATCH_SIZE or monotonic() >= batchDeadline:
+                    queueBatch(batch)
+                    batch = []
+        except Exception:
+            _log.exception("Receiver thread '%s' failed", self.receiverThread.name)
+        finally:
+            if batch:
+                self.inputQ.put(batch)
+            self.inputQ.put(None)
+            self._closeWakeup()
+            self._closedEvent.set()
+
+    def _closeWakeup(self):
+        """Close the selector and both ends of the wakeup pipe, if not already
+            closed.
+        """
+        with self._wakeupLock:
+            if self._wakeupWr is None:
+                return
+            self._selector.close()
+            os.close(self._wakeupRd)
+            os.close(self._wakeupWr)
+            self._wakeupRd = self._wakeupWr = None
+
+    def _setScheduling(self):
+        """Apply the requested CPU affinity and realtime priority to the calling
+            (i.e., receiver) thread.
+
+          N.B. A realtime priority generally requires root (or CAP_SYS_NICE).
+        """
+        try:
+            if self.cpuAffinity is not None:
+                os.sched_setaffinity(0, {self.cpuAffinity})
+            if self.rtPriority is not None:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.rtPriority))
+        except (AttributeError, OSError) as ex:
+            _log.warning("Unable to set scheduling of thread '%s': %s", self.receiverThread.name, ex)
+
+    def _queueBatch(self, batch):
+        """Put a list of inputs on the inputQ, and stop receiving if it's full.
+        """
+        if self.inputQ.full():
+            _log.error("Input queue full, discarding input and shutting down")
+            self.stopSignal.set()
+        else:
+            self.inputQ.put_nowait(batch)
+
+    def _receive(self, timeout=None):
+        """Block until there's input from the interface, or until 'timeout' secs
+            have passed (forever if None), and return the input.
+
+          Subclasses should block via _waitForInput() (or a native read timeout)
+           so that shutdown() can wake them up.
+          The default implementation waits on the fds given to registerFd() and
+           drains everything that's available from each ready fd in one go,
+           returning it as a single bytearray.
+
+          N.B. Anything other than None that's returned gets queued, so the
+            subclass decides what's worth queuing while it parses the input.
+
+          Returns: dict with the input in its 'data' key, or None if there's no
+                    input to be queued
+        """
+        data = bytearray()
+        for fd in self._waitForInput(timeout):
+            while True:
+                try:
+                    n = self._readInto(fd, data)
+                except BlockingIOError:
+                    break
+                if not n:
+                    break
+        return {'data': data} if data else None
+
+    def _readInto(self, fd, buf, n=READ_SIZE):
+        """Read up to 'n' (at most READ_SIZE) bytes from the given fd straight
+            onto the end of the given bytearray.
+
+          The bytearray is grown by 'n' bytes, read into in place, and trimmed
+           back to what was read -- so the data is only copied once, from the
+           kernel into where it's accumulating.
+
+          Returns: number of bytes read (zero at EOF)
+        """
+        start = len(buf)
+        buf += _READ_FILL[:n]
+        try:
+            with memoryview(buf) as view:
+                count = os.readv(fd, [view[start:]])
+        except BaseException:
+            del buf[start:]
+            raise
+        del buf[start + count:]
+        return count
+
+    def _newSlot(self):
+        """Return a new, empty input slot -- i.e., what _receive() returns.
+
+          Subclasses that fill in pooled slots override this to preallocate
+           whatever their inputs contain.
+        """
+        return {'data': None}
+
+    def _acquireSlot(self):
+        """Return an input slot for _receive() to fill in, reusing one that's
+            been released if there is one.
+        """
+        try:
+            return self._slotPool.popleft()
+        except IndexError:
+            return self._newSlot()
+
+    def release(self, inputs):
+        """Give an input returned by getInput() back to be reused.
+
+          Optional -- inputs that aren't released are just garbage collected.
+          N.B. The caller must not hold on to the input (or anything in it)
+            after releasing it.
+        """
+        if inputs is not None and len(self._slotPool) < SLOT_POOL_SIZE:
+            self._slotPool.append(inputs)
+
+    def registerFd(self, fd):
+        """Add an fd to the set that _waitForInput() waits on.
+
+          N.B. The fd is put into non-blocking mode so it can be drained.
+        """
+        os.set_blocking(fd, False)
+        self._selector.register(fd, selectors.EVENT_READ)
+
+    def _waitForInput(self, timeout=None):
+        """Block until at least one of the registered fds is readable, the
+            timeout expires, or the receiver is told to shutdown.
+
+          N.B. A wakeup is drained when it's seen, so it doesn't keep the
+            selector firing.
+
+          Returns: list of the registered fds that have input to be read
+        """
+        fds = []
+        for key, _ in self._selector.select(timeout):
+            if key.fd != self._wakeupRd:
+                fds.append(key.fd)
+                continue
+            try:
+                while os.read(self._wakeupRd, 64):
+                    pass
+            except BlockingIOError:
+                pass
+        return fds
 
     def getInput(self, block=True, timeout=None):
         """Return input from the input queue.
 
           Can optionally be a blocking call, with an optional timeout
+          Inputs are queued in batches, the rest of a batch is held here and
+           handed out one at a time by subsequent calls.
 
           Returns: next value from input queue, or None
         """
-        inputVal = None
+        try:
+            return self._pending.popleft()
+        except IndexError:
+            pass
+        batch = None
         if block:
-            inputVal = self.inputQ.get()
+            batch = self.inputQ.get()
         else:
             try:
-                inputVal = self.inputQ.get(block=True, timeout=timeout)
+                batch = self.inputQ.get(block=True, timeout=timeout)
             except:
-                logging.debug("No input, blocking get() timed out")
-        return inputVal
+                _log.debug("No input, blocking get() timed out")
+        if not batch:
+            return None
+        self._pending.extend(batch[1:])
+        return batch[0]
 
 
 #
@@ -103,12 +557,9 @@ if __name__ == '__main__':
 
     class DummyReceiver(Receiver):
         def __init__(self):
-            self.count = 0
+            self.rd, self.wr = os.pipe()
             super().__init__(name="DummyReceiver")
-        def _receive(self):
-            if self.count == 0:
-                print("Running")
-            self.count += 1
+            self.registerFd(self.rd)
 
     #### FIXME add real tests
     logging.basicConfig(level="DEBUG",
@@ -117,7 +568,8 @@ if __name__ == '__main__':
     print("Start")
     rx = DummyReceiver()
     rx.start()
-    time.sleep(1)
+    os.write(rx.wr, b"hello")
+    print(f"Input: {rx.getInput()}")
     print("Shutting down")
     rx.shutdown()
     assert rx.isShutdown(), "Not shut down properly"
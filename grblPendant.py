@@ -6,13 +6,14 @@ Application that connects a XHC WHB04B-4 pendant to a grbl controller
 import argparse
 import json
 import logging
-import os
 import signal
 import sys
 import threading
-import time
 import yaml
-from yaml import Loader
+try:
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
 
 from Controller import Controller
 from Host import Host
@@ -20,56 +21,77 @@ from Pendant import Pendant
 from Processor import Processor
 
 
+_log = logging.getLogger(__name__)
+
+# signals that shut the application down (SIGHUP doesn't exist everywhere)
+_SIGS = tuple(sig for sig in (getattr(signal, name, None)
+                              for name in ('SIGTERM', 'SIGHUP', 'SIGINT'))
+              if sig is not None)
+
 DEFAULTS = {
     'logLevel': "INFO",  #"DEBUG"  #"WARNING"
     'macroPath': "./whb04b.yml"
 }
 
+def loadMacros(macroPath):
+    """Load the macro key definitions from the given YAML file.
+
+      Returns: dict of macro definitions
+    """
+    with open(macroPath, "r") as f:
+        return yaml.load(f, Loader=Loader)
+
+
 def run(options):
     """????
     """
+    # N.B. set by the signal handlers (or by the Processor itself, when the
+    #  pendant asks for an exit) to wake up the main thread and shut down
+    exitEvent = threading.Event()
+
     def stop():
-        logging.debug(f"Active Threads: {threading.enumerate()}")
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug("Active Threads: %s", threading.enumerate())
         if proc:
-            logging.debug("Shutting down Processor")
+            _log.debug("Shutting down Processor")
             proc.shutdown()
         if host:
-            logging.debug("Shutting down Host")
+            _log.debug("Shutting down Host")
             host.shutdown(False)
         if ctlr:
-            logging.debug("Shutting down Controller")
+            _log.debug("Shutting down Controller")
             ctlr.shutdown()
         if pend:
-            logging.debug("Shutting down Pendant")
+            _log.debug("Shutting down Pendant")
             pend.shutdown()
 
     def shutdownHandler(signum, frame):
-        logging.debug(f"Caught signal: {signum}")
-        stop()
+        # N.B. only wake up the main thread, it does the logging and shutdown
+        exitEvent.set()
 
-    for s in ('TERM', 'HUP', 'INT'):
-        sig = getattr(signal, 'SIG'+s)
+    for sig in _SIGS:
         signal.signal(sig, shutdownHandler)
 
     def reloadHandler(signum, frame):
-        logging.debug(f"Caught signal: {signum}")
-        macros = {}
-        if os.path.exists(options.macroPath):
-            with open(options.macroPath, "r") as f:
-                macros = yaml.load(f, Loader=Loader)
-            proc.defineMacros(macros)
-            if options.verbose:
-                print("Reload Macros:")
-                json.dump(macros, sys.stdout, indent=4, sort_keys=True)
-                print("")
-        else:
-            logging.warning(f"Macros file '{options.macroPath}' does not exist")
+        _log.debug("Caught signal: %s", signum)
+        try:
+            macros = loadMacros(options.macroPath)
+        except FileNotFoundError:
+            _log.warning("Macros file '%s' does not exist", options.macroPath)
+            return
+        proc.defineMacros(macros)
+        if options.verbose:
+            print("Reload Macros:")
+            json.dump(macros, sys.stdout, indent=4, sort_keys=True)
+            print("")
 
     signal.signal(signal.SIGUSR1, reloadHandler)
 
-    macros = {}
-    with open(options.macroPath, "r") as f:
-        macros = yaml.load(f, Loader=Loader)
+    try:
+        macros = loadMacros(options.macroPath)
+    except FileNotFoundError:
+        _log.error("Macro key definitions file not found: %s", options.macroPath)
+        return 1
     if options.verbose:
         print("Initial Macros:")
         json.dump(macros, sys.stdout, indent=4, sort_keys=True)
@@ -78,7 +100,7 @@ def run(options):
     pend = Pendant()
     ctlr = Controller()
     host = Host()
-    proc = Processor(pend, ctlr, host, macros)
+    proc = Processor(pend, ctlr, host, macros, exitEvent)
     if proc:
         if options.magicCommands:
             magicCmdNames = proc.magicCommandNames()
@@ -89,17 +111,17 @@ def run(options):
             else:
                 print(f"Magic Commands: {magicCmdNames}")
         else:
-            while proc.isAlive():
-                #### FIXME do something here
-                print("running...")
-                time.sleep(30)
+            exitEvent.wait()
+            _log.debug("Exit requested")
     stop()
-    sys.exit(0)
+    return 0
 
 
-def getOpts():
-    usage = f"Usage: {sys.argv[0]} [-v] [-L <logLevel>] [-l <logFile>] " + \
-      "[-m <macroPath>] [-M]"
+def _buildParser():
+    """Build the command line parser.
+
+      N.B. done once, at import time, so getOpts() just has to parse
+    """
     ap = argparse.ArgumentParser()
     ap.add_argument(
         "-L", "--logLevel", action="store", type=str,
@@ -118,7 +140,13 @@ def getOpts():
     ap.add_argument(
         "-v", "--verbose", action="count", default=0,
         help="Enable printing of debug info")
-    opts = ap.parse_args()
+    return ap
+
+_PARSER = _buildParser()
+
+
+def getOpts():
+    opts = _PARSER.parse_args()
 
     if opts.logFile:
         logging.basicConfig(filename=opts.logFile,
@@ -130,19 +158,22 @@ def getOpts():
                             format='%(asctime)s %(levelname)-8s %(message)s',
                             datefmt='%Y-%m-%d %H:%M:%S')
 
-    if not os.path.exists(opts.macroPath):
-        logging.error(f"Macro key definitions file not found: {opts.macroPath}")
-        sys.exit(1)
-
+    # N.B. a missing macro definitions file is caught when it's opened in run()
     if opts.verbose:
         print(f"    Macro definitions file: {opts.macroPath}")
     return opts
 
 
+def main():
+    """Parse the command line options and run the application.
+
+      Returns: the application's exit status
+    """
+    return run(getOpts())
+
+
 if __name__ == '__main__':
-    opts = getOpts()
-    r = run(opts)
-    sys.exit(r)
+    sys.exit(main())
 
 
 